@@ -1,30 +1,34 @@
-from flask import Flask, render_template, jsonify, request
-import cv2
-import numpy as np
+from utils.startup_profile import profiler
+with profiler.track("flask"):
+    from flask import Flask, render_template, jsonify, request, Response
+    from werkzeug.utils import secure_filename
 import time
 import os
 import glob
-from werkzeug.utils import secure_filename
 import base64
 import threading
-import matplotlib
-matplotlib.use('Agg')  # Use non-GUI backend
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
 from io import BytesIO
 from datetime import datetime
 from collections import deque
-app = Flask(__name__)
+import json
+with profiler.track("utils.streaming_stats"):
+    from utils.streaming_stats import TrafficStatistics
+
+# Heavy dependencies - loaded on first use (see load_vision / load_matplotlib)
+cv2 = None
+np = None
+Figure = None
+vision_import_lock = threading.Lock()
+matplotlib_import_lock = threading.Lock()
+
+with profiler.track("flask app", kind="init"):
+    app = Flask(__name__)
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'flv', 'wmv', 'webm', 'mp4v'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024
 
-# Create upload folder
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
 # Global variables
 video_capture = None
 video_lock = threading.Lock()
@@ -39,6 +43,9 @@ traffic_history = {
     'cluster_level': deque(maxlen=50)
 }
 
+# Online statistics and congestion events (per stream)
+traffic_stats = TrafficStatistics()
+
 class TrafficAnalyzer:
     """Simple traffic analyzer"""
     
@@ -130,6 +137,53 @@ class TrafficAnalyzer:
 
 analyzer = TrafficAnalyzer()
 
+def load_vision():
+    """Import OpenCV and NumPy (once, when a stream starts)"""
+    global cv2, np
+    
+    if cv2 is not None:
+        return
+    
+    with vision_import_lock:
+        if cv2 is None:
+            with profiler.track("numpy", kind="lazy"):
+                import numpy
+            with profiler.track("cv2", kind="lazy"):
+                import cv2 as opencv
+            np = numpy
+            cv2 = opencv
+
+def load_matplotlib():
+    """Import matplotlib with the Agg backend (once, on first graph)"""
+    global Figure
+    
+    if Figure is not None:
+        return
+    
+    with matplotlib_import_lock:
+        if Figure is None:
+            with profiler.track("matplotlib", kind="lazy"):
+                import matplotlib
+                matplotlib.use('Agg')  # Use non-GUI backend
+                from matplotlib.figure import Figure as MplFigure
+            Figure = MplFigure
+
+def ensure_upload_folder():
+    """Create upload folder if missing"""
+    if not os.path.exists(UPLOAD_FOLDER):
+        os.makedirs(UPLOAD_FOLDER)
+
+def log_traffic_events(events):
+    """Print congestion events to the console"""
+    for event in events:
+        print(f"Traffic event: {event['type']} on {event['stream']} ({event['reason']})")
+
+def reset_stream_stats(*streams):
+    """Close out statistics for streams being torn down"""
+    for stream in set(streams):
+        if stream != "none":
+            log_traffic_events(traffic_stats.reset(stream))
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -137,6 +191,8 @@ def init_webcam():
     """Initialize webcam"""
     global video_capture, current_video_source
     
+    load_vision()
+    
     with video_lock:
         # Release existing
         if video_capture is not None:
@@ -145,6 +201,7 @@ def init_webcam():
             except:
                 pass
             video_capture = None
+        reset_stream_stats(current_video_source, "webcam")
         
         time.sleep(0.5)
         
@@ -181,6 +238,8 @@ def init_video_file(filepath):
     """Initialize video file"""
     global video_capture, current_video_source, current_video_path
     
+    load_vision()
+    
     with video_lock:
         # Release existing
         if video_capture is not None:
@@ -189,6 +248,7 @@ def init_video_file(filepath):
             except:
                 pass
             video_capture = None
+        reset_stream_stats(current_video_source, "file")
         
         time.sleep(0.5)
         
@@ -247,6 +307,7 @@ def upload_video():
                 pass
         
         # Save file
+        ensure_upload_folder()
         filename = secure_filename(file.filename)
         filepath = os.path.join(UPLOAD_FOLDER, filename)
         file.save(filepath)
@@ -281,6 +342,7 @@ def delete_video():
                 except:
                     pass
                 video_capture = None
+            reset_stream_stats(current_video_source)
         
         # Delete files
         count = 0
@@ -337,11 +399,14 @@ def traffic_snapshot():
                     "message": "No video source active"
                 })
             
+            # Source this frame belongs to
+            source = current_video_source
+            
             # Read frame
             ret, frame = video_capture.read()
             
             # Loop video if ended
-            if not ret and current_video_source == "file":
+            if not ret and source == "file":
                 video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
                 ret, frame = video_capture.read()
             
@@ -362,6 +427,10 @@ def traffic_snapshot():
         traffic_history['vehicle_count'].append(count)
         traffic_history['cluster_level'].append(0 if level == "low" else 1 if level == "medium" else 2)
         
+        # Update streaming statistics
+        events = traffic_stats.update(source, density, count, level)
+        log_traffic_events(events)
+        
         # Generate summary
         summary = analyzer.generate_summary(density, count, level)
         
@@ -377,8 +446,9 @@ def traffic_snapshot():
             "cluster_label": 0 if level == "low" else 1 if level == "medium" else 2,
             "cluster_level": level,
             "summary": summary,
-            "video_source": current_video_source,
-            "frame": frame_base64
+            "video_source": source,
+            "frame": frame_base64,
+            "events": events
         })
         
     except Exception as e:
@@ -422,6 +492,8 @@ def generate_graph():
                 "message": "Not enough data. Please wait for traffic analysis to collect data."
             })
         
+        load_matplotlib()
+        
         # Create figure with subplots
         fig = Figure(figsize=(12, 8))
         fig.patch.set_facecolor('#f8f9fa')
@@ -478,7 +550,6 @@ def generate_graph():
         buf.seek(0)
         graph_base64 = base64.b64encode(buf.read()).decode('utf-8')
         buf.close()
-        plt.close(fig)
         
         return jsonify({
             "status": "success",
@@ -494,6 +565,72 @@ def generate_graph():
             "message": f"Graph generation error: {str(e)}"
         })
 
+@app.route("/api/traffic_stats", methods=["GET"])
+def traffic_stats_api():
+    """Running statistics per stream"""
+    try:
+        stream = request.args.get("stream")
+        
+        if stream:
+            stats = traffic_stats.snapshot(stream)
+            if stats is None:
+                return jsonify({"status": "error", "message": f"No statistics for stream: {stream}"})
+            return jsonify({"status": "success", "stream": stream, "stats": stats})
+        
+        return jsonify({"status": "success", "streams": traffic_stats.snapshot()})
+        
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)})
+
+@app.route("/api/traffic_events", methods=["GET"])
+def traffic_events():
+    """Congestion events newer than ?since=<id>"""
+    try:
+        since = request.args.get("since", 0, type=int)
+        stream = request.args.get("stream")
+        events = traffic_stats.events_since(since, stream)
+        
+        return jsonify({
+            "status": "success",
+            "events": events,
+            "last_id": events[-1]["id"] if events else since
+        })
+        
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)})
+
+@app.route("/api/traffic_events/stream", methods=["GET"])
+def traffic_events_stream():
+    """Server-sent event stream of congestion events"""
+    # EventSource reconnects send Last-Event-ID instead of ?since=
+    since = request.headers.get("Last-Event-ID", type=int)
+    if since is None:
+        since = request.args.get("since", 0, type=int)
+    stream = request.args.get("stream")
+    
+    def generate():
+        last_id = since
+        while True:
+            events = traffic_stats.wait_for_events(last_id, stream, timeout=15.0)
+            if not events:
+                # Keep connection alive
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                last_id = event["id"]
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
+@app.route("/api/startup_report", methods=["GET"])
+def startup_report():
+    """Import and init cost per module"""
+    try:
+        return jsonify({"status": "success", "report": profiler.report()})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)})
+
 @app.route("/api/status", methods=["GET"])
 def status():
     try:
@@ -514,6 +651,9 @@ if __name__ == "__main__":
     print("🚦 URBAN TRAFFIC FLOW CLUSTERING SYSTEM")
     print("="*70)
     print("🌐 Starting server at: http://127.0.0.1:5000/")
+    print("="*70)
+    print("⏱  Startup cost:")
+    print(profiler.format_report())
     print("="*70 + "\n")
     
     try:
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from utils.startup_profile import StartupProfiler
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_track_records_entries_and_totals():
+    profiler = StartupProfiler()
+    with profiler.track("fast"):
+        pass
+    with profiler.track("slow", kind="lazy"):
+        time.sleep(0.02)
+    with profiler.track("other"):
+        pass
+
+    report = profiler.report()
+    names = [entry["name"] for entry in report["entries"]]
+    assert names[0] == "slow"
+    assert sorted(names) == ["fast", "other", "slow"]
+    assert report["entries"][0]["kind"] == "lazy"
+    assert report["entries"][0]["ms"] >= 20
+
+    imports = [e["ms"] for e in report["entries"] if e["kind"] == "import"]
+    assert report["totals_ms"]["import"] == pytest.approx(sum(imports), abs=0.02)
+    assert report["totals_ms"]["lazy"] == report["entries"][0]["ms"]
+    assert report["uptime_ms"] >= report["entries"][0]["ms"]
+
+
+def test_track_records_on_error():
+    profiler = StartupProfiler()
+    with pytest.raises(ValueError):
+        with profiler.track("broken"):
+            raise ValueError("boom")
+
+    assert [e["name"] for e in profiler.report()["entries"]] == ["broken"]
+
+
+def test_importing_app_skips_heavy_dependencies():
+    pytest.importorskip("flask")
+
+    code = (
+        "import sys, app\n"
+        "print(','.join(m for m in ('cv2', 'numpy', 'matplotlib') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
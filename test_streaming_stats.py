@@ -0,0 +1,105 @@
+import random
+import statistics
+
+from utils.streaming_stats import P2Quantile, TrafficStatistics
+
+
+def feed(stats, densities, stream="webcam", start=0.0, step=0.5):
+    """Send densities to stats, return all raised events"""
+    events = []
+    for i, density in enumerate(densities):
+        level = "low" if density < 0.35 else "medium" if density < 0.70 else "high"
+        events += stats.update(stream, density, int(density * 20), level, now=start + i * step)
+    return events
+
+
+def test_p2_quantile_matches_sorted():
+    rng = random.Random(1)
+    values = [rng.random() for _ in range(20000)]
+    ordered = sorted(values)
+
+    for q in (0.5, 0.9, 0.95):
+        sketch = P2Quantile(q)
+        for x in values:
+            sketch.add(x)
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(sketch.value() - exact) < 0.01
+
+
+def test_p2_quantile_small_samples():
+    sketch = P2Quantile(0.5)
+    assert sketch.value() is None
+    for x in (3, 1, 2):
+        sketch.add(x)
+    assert sketch.value() == 2
+
+
+def test_rolling_quantile_follows_level_shift():
+    stats = TrafficStatistics(quantile_window=300.0)
+    feed(stats, [0.2] * 10000)
+    feed(stats, [0.9] * 600, start=5000.0)
+
+    quantiles = stats.snapshot("webcam")["density_quantiles"]
+    assert abs(quantiles["p50"] - 0.9) < 1e-6
+    assert abs(quantiles["p95"] - 0.9) < 1e-6
+
+
+def test_rolling_quantile_restarts_after_idle_gap():
+    stats = TrafficStatistics(idle_timeout=30.0)
+    feed(stats, [0.2] * 100)
+    feed(stats, [0.8] * 3, start=1000.0)
+
+    assert stats.snapshot("webcam")["density_quantiles"]["p50"] == 0.8
+
+
+def test_vehicle_count_variance_matches_statistics():
+    rng = random.Random(2)
+    counts = [rng.randint(0, 30) for _ in range(500)]
+    stats = TrafficStatistics()
+    for i, count in enumerate(counts):
+        stats.update("file", 0.3, count, "low", now=i * 0.5)
+
+    snapshot = stats.snapshot("file")
+    assert abs(snapshot["vehicle_count_mean"] - statistics.mean(counts)) < 1e-3
+    assert abs(snapshot["vehicle_count_variance"] - statistics.variance(counts)) < 1e-3
+
+
+def test_step_input_raises_one_onset_and_one_clearance():
+    stats = TrafficStatistics()
+    events = feed(stats, [0.2] * 40 + [0.9] * 40 + [0.1] * 40)
+
+    assert [e["type"] for e in events] == ["congestion_onset", "congestion_clearance"]
+    assert events[0]["stream"] == "webcam"
+    assert events[1]["duration_seconds"] > 0
+    assert stats.events_since(events[0]["id"]) == [events[1]]
+
+
+def test_stationary_noise_raises_no_events():
+    for seed in range(5):
+        rng = random.Random(seed)
+        stats = TrafficStatistics()
+        densities = [min(1.0, max(0.0, rng.gauss(0.55, 0.15))) for _ in range(2000)]
+        assert feed(stats, densities) == []
+
+
+def test_level_time_is_capped_across_gaps():
+    stats = TrafficStatistics(poll_interval=0.5)
+    feed(stats, [0.9] * 10)
+    stats.update("webcam", 0.1, 1, "low", now=3600)
+
+    snapshot = stats.snapshot("webcam")
+    assert snapshot["level_seconds"]["high"] <= 10 * 1.0
+    assert snapshot["ewma_density"] == 0.1
+
+
+def test_reset_closes_open_incident():
+    stats = TrafficStatistics()
+    events = feed(stats, [0.2] * 40 + [0.9] * 40)
+    assert [e["type"] for e in events] == ["congestion_onset"]
+
+    cleared = stats.reset("webcam", now=100)
+    assert len(cleared) == 1
+    assert cleared[0]["type"] == "congestion_clearance"
+    assert cleared[0]["reason"] == "stream_reset"
+    assert stats.snapshot("webcam") is None
+    assert stats.reset("webcam") == []
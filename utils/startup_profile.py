@@ -0,0 +1,56 @@
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """
+    Record how long each import / init step takes
+    Lazy steps are recorded too, when they first run
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.entries = []
+
+    @contextmanager
+    def track(self, name, kind="import"):
+        """Time a block and store it under name"""
+        modules_before = len(sys.modules)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.entries.append({
+                "name": name,
+                "kind": kind,
+                "ms": round(elapsed * 1000, 2),
+                "modules_loaded": len(sys.modules) - modules_before,
+                "at_ms": round((t0 - self.started) * 1000, 2),
+            })
+
+    def report(self):
+        """Breakdown of recorded steps, slowest first"""
+        entries = sorted(self.entries, key=lambda e: e["ms"], reverse=True)
+        totals = {}
+        for entry in self.entries:
+            totals[entry["kind"]] = round(totals.get(entry["kind"], 0.0) + entry["ms"], 2)
+        return {
+            "entries": entries,
+            "totals_ms": totals,
+            "uptime_ms": round((time.perf_counter() - self.started) * 1000, 2),
+        }
+
+    def format_report(self):
+        """Plain text table for the console"""
+        data = self.report()
+        lines = [f"{'step':<28}{'kind':<10}{'ms':>10}{'modules':>10}"]
+        for entry in data["entries"]:
+            lines.append(f"{entry['name']:<28}{entry['kind']:<10}{entry['ms']:>10.2f}{entry['modules_loaded']:>10}")
+        for kind, total in data["totals_ms"].items():
+            lines.append(f"total {kind}: {total:.2f} ms")
+        return "\n".join(lines)
+
+
+profiler = StartupProfiler()
@@ -0,0 +1,373 @@
+import math
+import threading
+import time
+from collections import deque
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate using the P-square algorithm
+    Keeps 5 markers, so memory is fixed no matter how many values arrive
+    """
+
+    def __init__(self, q):
+        self.q = q
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self.increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def add(self, x):
+        """Add one value - O(1)"""
+        if len(self.heights) < 5:
+            self.heights.append(x)
+            self.heights.sort()
+            return
+
+        h = self.heights
+        n = self.positions
+
+        # Find cell k containing x and extend extremes
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = 0
+            while k < 3 and x >= h[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Adjust the three middle markers
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = self._parabolic(i, step)
+                if not h[i - 1] < candidate < h[i + 1]:
+                    candidate = h[i] + step * (h[i + step] - h[i]) / (n[i + step] - n[i])
+                h[i] = candidate
+                n[i] += step
+
+    def _parabolic(self, i, d):
+        h = self.heights
+        n = self.positions
+        return h[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self):
+        """Current quantile estimate (None until first value)"""
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            idx = int(round(self.q * (len(self.heights) - 1)))
+            return self.heights[idx]
+        return self.heights[2]
+
+
+class RollingQuantile:
+    """
+    Quantile over a sliding time window with fixed memory
+    A new P-square sketch is started every window / buckets seconds and
+    dropped once it is older than the window. The oldest live sketch is
+    reported, so the estimate covers between (buckets - 1) / buckets of
+    the window and the full window.
+    """
+
+    def __init__(self, q, window, buckets):
+        self.q = q
+        self.window = window
+        self.bucket_seconds = window / buckets
+        self.sketches = deque()  # (start_time, P2Quantile)
+
+    def add(self, x, now):
+        """Add one value - O(buckets)"""
+        while self.sketches and now - self.sketches[0][0] >= self.window:
+            self.sketches.popleft()
+        if not self.sketches or now - self.sketches[-1][0] >= self.bucket_seconds:
+            self.sketches.append((now, P2Quantile(self.q)))
+        for _, sketch in self.sketches:
+            sketch.add(x)
+
+    def value(self):
+        """Current quantile estimate (None until first value)"""
+        if not self.sketches:
+            return None
+        return self.sketches[0][1].value()
+
+    def clear(self):
+        self.sketches.clear()
+
+
+class StreamStats:
+    """Running statistics for one video stream"""
+
+    LEVELS = ("low", "medium", "high")
+    QUANTILES = (0.5, 0.9, 0.95)
+
+    def __init__(self, alpha, trend_alpha, max_gap, idle_timeout,
+                 quantile_window, quantile_buckets):
+        self.alpha = alpha
+        self.trend_alpha = trend_alpha
+        self.max_gap = max_gap
+        self.idle_timeout = idle_timeout
+        self.samples = 0
+        self.ewma_density = None
+        self.trend = 0.0
+        self.quantiles = {q: RollingQuantile(q, quantile_window, quantile_buckets)
+                          for q in self.QUANTILES}
+
+        # Welford accumulators for vehicle count
+        self.count_mean = 0.0
+        self.count_m2 = 0.0
+
+        self.level_seconds = {level: 0.0 for level in self.LEVELS}
+        self.last_level = None
+        self.last_time = None
+
+        # Incident state
+        self.congested = False
+        self.congested_since = None
+        self.samples_in_state = 0
+        self.onset_run = 0
+        self.clear_run = 0
+        self.rising_run = 0
+        self.falling_run = 0
+
+    def update(self, density, count, level, now):
+        """Fold one snapshot into the running statistics - O(1)"""
+        self.samples += 1
+        self.samples_in_state += 1
+
+        gap = None
+        if self.last_time is not None:
+            gap = max(0.0, now - self.last_time)
+
+        # EWMA density, its smoothed slope and the quantile window
+        # all restart after a long idle gap
+        if self.ewma_density is None or (gap is not None and gap > self.idle_timeout):
+            for sketch in self.quantiles.values():
+                sketch.clear()
+            self.ewma_density = density
+            self.trend = 0.0
+            self.rising_run = 0
+            self.falling_run = 0
+        else:
+            previous = self.ewma_density
+            self.ewma_density = self.alpha * density + (1 - self.alpha) * previous
+            delta = self.ewma_density - previous
+            self.trend = self.trend_alpha * delta + (1 - self.trend_alpha) * self.trend
+
+        for sketch in self.quantiles.values():
+            sketch.add(density, now)
+
+        # Vehicle count variance
+        diff = count - self.count_mean
+        self.count_mean += diff / self.samples
+        self.count_m2 += diff * (count - self.count_mean)
+
+        # Time spent at each level (previous level owns the elapsed interval,
+        # capped so an idle stream is not credited with the whole gap)
+        if gap is not None and self.last_level in self.level_seconds:
+            self.level_seconds[self.last_level] += min(gap, self.max_gap)
+        self.last_level = level
+        self.last_time = now
+
+    def count_variance(self):
+        if self.samples < 2:
+            return 0.0
+        return self.count_m2 / (self.samples - 1)
+
+    def to_dict(self):
+        variance = self.count_variance()
+        return {
+            "samples": self.samples,
+            "ewma_density": round(self.ewma_density, 4) if self.ewma_density is not None else None,
+            "density_trend": round(self.trend, 5),
+            "density_quantiles": {
+                f"p{int(q * 100)}": (round(s.value(), 4) if s.value() is not None else None)
+                for q, s in self.quantiles.items()
+            },
+            "vehicle_count_mean": round(self.count_mean, 3),
+            "vehicle_count_variance": round(variance, 3),
+            "vehicle_count_std": round(math.sqrt(variance), 3),
+            "level_seconds": {k: round(v, 2) for k, v in self.level_seconds.items()},
+            "current_level": self.last_level,
+            "congested": self.congested,
+            "congested_since": self.congested_since,
+        }
+
+
+class TrafficStatistics:
+    """
+    Online statistics and congestion incident detection for all streams
+    Each snapshot is processed in O(1); history is never rescanned
+
+    Onset needs EWMA density >= onset_threshold, or >= trend_onset_level with
+    a rising trend. Clearance needs EWMA < clear_threshold, or < trend_clear_level
+    with a falling trend. Every condition must hold for confirm_samples snapshots
+    in a row, and the state cannot flip back within min_dwell_samples.
+    A new stream starts in the clear state, so min_dwell_samples is also
+    its warm-up before the first onset can fire.
+
+    Density quantiles cover the last quantile_window seconds.
+    """
+
+    def __init__(self, alpha=0.2, trend_alpha=0.3,
+                 onset_threshold=0.65, clear_threshold=0.45,
+                 trend_onset_level=0.6, trend_clear_level=0.5,
+                 trend_threshold=0.02, confirm_samples=10,
+                 min_dwell_samples=20, poll_interval=0.5, idle_timeout=30.0,
+                 quantile_window=300.0, quantile_buckets=5, max_events=200):
+        self.alpha = alpha
+        self.trend_alpha = trend_alpha
+        self.onset_threshold = onset_threshold
+        self.clear_threshold = clear_threshold
+        self.trend_onset_level = trend_onset_level
+        self.trend_clear_level = trend_clear_level
+        self.trend_threshold = trend_threshold
+        self.confirm_samples = confirm_samples
+        self.min_dwell_samples = min_dwell_samples
+        self.max_gap = 2 * poll_interval
+        self.idle_timeout = idle_timeout
+        self.quantile_window = quantile_window
+        self.quantile_buckets = quantile_buckets
+
+        self.streams = {}
+        self.events = deque(maxlen=max_events)
+        self.next_event_id = 1
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+
+    def update(self, stream_id, density, count, level, now=None):
+        """
+        Record one snapshot for a stream
+        Returns: list of events raised by this snapshot
+        """
+        if now is None:
+            now = time.time()
+
+        with self.lock:
+            stats = self.streams.get(stream_id)
+            if stats is None:
+                stats = StreamStats(self.alpha, self.trend_alpha, self.max_gap, self.idle_timeout,
+                                    self.quantile_window, self.quantile_buckets)
+                self.streams[stream_id] = stats
+
+            stats.update(density, count, level, now)
+            raised = self._detect(stream_id, stats, now)
+
+            if raised:
+                self.condition.notify_all()
+            return raised
+
+    def _detect(self, stream_id, stats, now):
+        """Check thresholds and trend for onset / clearance"""
+        ewma = stats.ewma_density
+
+        # Track how long each condition has held
+        stats.onset_run = stats.onset_run + 1 if ewma >= self.onset_threshold else 0
+        stats.clear_run = stats.clear_run + 1 if ewma < self.clear_threshold else 0
+        stats.rising_run = stats.rising_run + 1 if stats.trend >= self.trend_threshold else 0
+        stats.falling_run = stats.falling_run + 1 if stats.trend <= -self.trend_threshold else 0
+
+        if stats.samples_in_state < self.min_dwell_samples:
+            return []
+
+        reason = None
+
+        if not stats.congested:
+            if stats.onset_run >= self.confirm_samples:
+                reason = "threshold"
+            elif ewma >= self.trend_onset_level and stats.rising_run >= self.confirm_samples:
+                reason = "rising_trend"
+
+            if reason:
+                stats.congested = True
+                stats.congested_since = now
+                stats.samples_in_state = 0
+                return [self._emit("congestion_onset", stream_id, stats, now, reason)]
+        else:
+            if stats.clear_run >= self.confirm_samples:
+                reason = "threshold"
+            elif ewma < self.trend_clear_level and stats.falling_run >= self.confirm_samples:
+                reason = "falling_trend"
+
+            if reason:
+                return [self._clear(stream_id, stats, now, reason)]
+
+        return []
+
+    def _clear(self, stream_id, stats, now, reason):
+        duration = now - stats.congested_since if stats.congested_since else 0.0
+        stats.congested = False
+        stats.congested_since = None
+        stats.samples_in_state = 0
+        event = self._emit("congestion_clearance", stream_id, stats, now, reason)
+        event["duration_seconds"] = round(duration, 2)
+        return event
+
+    def _emit(self, event_type, stream_id, stats, now, reason):
+        event = {
+            "id": self.next_event_id,
+            "type": event_type,
+            "stream": stream_id,
+            "reason": reason,
+            "timestamp": now,
+            "ewma_density": round(stats.ewma_density, 4),
+            "density_trend": round(stats.trend, 5),
+        }
+        self.next_event_id += 1
+        self.events.append(event)
+        return event
+
+    def snapshot(self, stream_id=None):
+        """Statistics for one stream, or all streams"""
+        with self.lock:
+            if stream_id is not None:
+                stats = self.streams.get(stream_id)
+                return stats.to_dict() if stats else None
+            return {name: stats.to_dict() for name, stats in self.streams.items()}
+
+    def events_since(self, last_id=0, stream_id=None):
+        """Events with id greater than last_id"""
+        with self.lock:
+            return self._events_since(last_id, stream_id)
+
+    def _events_since(self, last_id, stream_id):
+        return [e for e in self.events
+                if e["id"] > last_id and (stream_id is None or e["stream"] == stream_id)]
+
+    def wait_for_events(self, last_id=0, stream_id=None, timeout=15.0):
+        """Block until new events arrive or timeout expires"""
+        with self.condition:
+            pending = self._events_since(last_id, stream_id)
+            if not pending:
+                self.condition.wait(timeout)
+                pending = self._events_since(last_id, stream_id)
+            return pending
+
+    def reset(self, stream_id, now=None):
+        """
+        Forget statistics for a stream
+        Returns: clearance event if the stream was congested, else []
+        """
+        if now is None:
+            now = time.time()
+
+        with self.lock:
+            stats = self.streams.pop(stream_id, None)
+            if stats is None or not stats.congested:
+                return []
+
+            event = self._clear(stream_id, stats, now, "stream_reset")
+            self.condition.notify_all()
+            return [event]